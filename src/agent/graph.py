@@ -1,9 +1,19 @@
 """LangGraph agent with MCP integration."""
 
-from typing import Any, TypedDict
+import copy
+import os
+from functools import cache, lru_cache
+from typing import Any, Callable, Mapping, TypedDict
 
 from langgraph.graph import END, StateGraph
 
+from ..mcp_server.server import (
+    add_product,
+    get_catalog_version,
+    get_product,
+    get_statistics,
+    list_products,
+)
 from .mock_llm import MockLLM, ParseResult
 from .tools import (
     calculate_discount,
@@ -13,8 +23,37 @@ from .tools import (
 )
 
 
-class AgentState(TypedDict):
-    """State for the agent graph."""
+# MCP tools callable by the agent, keyed by tool name
+_MCP_TOOLS = {
+    "list_products": list_products,
+    "get_product": get_product,
+    "add_product": add_product,
+    "get_statistics": get_statistics,
+}
+
+# Tools that change the catalog; queries using them are never cached
+_MUTATING_TOOLS = frozenset({"add_product"})
+
+
+def _format_get_product(result: dict) -> tuple[str, Any]:
+    if isinstance(result, dict) and "name" in result:
+        return "product", result
+    return "error", result.get("error", "Продукт не найден")
+
+
+# Response formatters keyed by tool name; each maps a tool result to a
+# (response key, value) pair. Other tools are returned under their own name.
+_FORMATTERS: dict[str, Callable[[Any], tuple[str, Any]]] = {
+    "list_products": lambda result: ("products", format_product_list(result)),
+    "get_product": _format_get_product,
+    "get_statistics": lambda result: ("statistics", format_statistics(result)),
+    "add_product": lambda result: ("added_product", result),
+    "calculate_discount": lambda result: ("discount", result),
+}
+
+
+class AgentState(TypedDict, total=False):
+    """State for the agent graph. Keys are absent until a node sets them."""
     query: str
     parse_result: ParseResult | None
     tool_results: dict[str, Any]
@@ -26,9 +65,25 @@ class AgentState(TypedDict):
 class ProductAgent:
     """LangGraph-based agent for product queries."""
 
-    def __init__(self):
+    def __init__(self, use_graph: bool | None = None, cache_size: int = 1024):
+        """Create the agent.
+
+        Args:
+            use_graph: Run queries through the compiled LangGraph graph.
+                Defaults to True when the LANGGRAPH_DEBUG environment
+                variable is set. Otherwise the nodes are called directly,
+                which gives the same result for this linear pipeline
+                without LangGraph's per-invocation overhead.
+            cache_size: Number of read-only query results to keep
+        """
+        if use_graph is None:
+            use_graph = bool(os.environ.get("LANGGRAPH_DEBUG"))
+        self.use_graph = use_graph
         self.llm = MockLLM()
         self.graph = self._build_graph()
+        self._run_cached = lru_cache(maxsize=cache_size)(self._run_versioned)
+        # Catalog version the entries in _run_cached were computed for
+        self._cached_version: int | None = None
 
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph state graph."""
@@ -47,6 +102,12 @@ class ProductAgent:
 
         return graph.compile()
 
+    def _run_nodes(self, state: AgentState) -> AgentState:
+        """Run the graph nodes in order without LangGraph, updating state in place."""
+        for node in (self._parse_request, self._execute_tools, self._format_response):
+            state.update(node(state))
+        return state
+
     def _parse_request(self, state: AgentState) -> dict:
         """Parse the user request using mock LLM."""
         try:
@@ -63,7 +124,7 @@ class ProductAgent:
         if state.get("error"):
             return {}
 
-        parse_result = state["parse_result"]
+        parse_result = state.get("parse_result")
         if not parse_result:
             return {"error": "No parse result"}
 
@@ -96,28 +157,15 @@ class ProductAgent:
 
         return {"tool_results": tool_results}
 
-    def _call_mcp_tool(self, tool_name: str, arguments: dict) -> Any:
+    def _call_mcp_tool(self, tool_name: str, arguments: Mapping[str, Any]) -> Any:
         """Call MCP tool.
 
         In this implementation, we directly import and call the MCP server tools.
         In production, this would use the MCP protocol via stdio subprocess.
         """
-        from src.mcp_server.server import (
-            list_products,
-            get_product,
-            add_product,
-            get_statistics,
-        )
-
-        tool_map = {
-            "list_products": list_products,
-            "get_product": get_product,
-            "add_product": add_product,
-            "get_statistics": get_statistics,
-        }
-
-        if tool_name in tool_map:
-            return tool_map[tool_name](**arguments)
+        tool = _MCP_TOOLS.get(tool_name)
+        if tool is not None:
+            return tool(**arguments)
 
         return {"error": f"Unknown tool: {tool_name}"}
 
@@ -126,7 +174,7 @@ class ProductAgent:
         if state.get("error"):
             return {"response": {"error": state["error"]}}
 
-        tool_results = state.get("tool_results", {})
+        tool_results = state.get("tool_results")
 
         if not tool_results:
             return {"response": {"error": "Не удалось выполнить запрос"}}
@@ -135,44 +183,65 @@ class ProductAgent:
         response_data = {}
 
         for tool_name, result in tool_results.items():
-            if tool_name == "list_products":
-                response_data["products"] = format_product_list(result)
-            elif tool_name == "get_product":
-                if isinstance(result, dict) and "name" in result:
-                    response_data["product"] = result
-                else:
-                    response_data["error"] = result.get("error", "Продукт не найден")
-            elif tool_name == "get_statistics":
-                response_data["statistics"] = format_statistics(result)
-            elif tool_name == "add_product":
-                response_data["added_product"] = result
-            elif tool_name == "calculate_discount":
-                response_data["discount"] = result
-            else:
+            formatter = _FORMATTERS.get(tool_name)
+            if formatter is None:
                 response_data[tool_name] = result
+            else:
+                key, value = formatter(result)
+                response_data[key] = value
 
         return {"response": response_data}
 
-    def process_query(self, query: str) -> dict:
+    def process_query(self, query: str, use_cache: bool = True) -> dict:
         """Process a user query.
 
+        Results of read-only queries are cached per catalog version, so a
+        repeated query skips the pipeline until the catalog changes. Each
+        call gets its own deep copy of the cached result.
+
         Args:
             query: User query string
+            use_cache: Use the result cache; callers that cache results
+                themselves pass False to avoid holding them twice
 
         Returns:
             Dictionary with response and tools_used
         """
-        initial_state: AgentState = {
-            "query": query,
-            "parse_result": None,
-            "tool_results": {},
-            "response": "",
-            "tools_used": [],
-            "error": None
-        }
-
-        # Run the graph
-        final_state = self.graph.invoke(initial_state)
+        if use_cache and self.is_read_only(query):
+            version = get_catalog_version()
+            if version != self._cached_version:
+                # Results for an older catalog can never be returned again
+                self._run_cached.cache_clear()
+                self._cached_version = version
+            return copy.deepcopy(self._run_cached(version, query))
+        return self._run(query)
+
+    def is_read_only(self, query: str) -> bool:
+        """Check whether a query only reads the catalog."""
+        try:
+            parse_result = self.llm.parse(query)
+        except Exception:
+            return False
+        return not any(tc.tool_name in _MUTATING_TOOLS for tc in parse_result.tool_calls)
+
+    def clear_cache(self) -> None:
+        """Drop all cached query results and parse results."""
+        self._run_cached.cache_clear()
+        self.llm.clear_cache()
+
+    def _run_versioned(self, catalog_version: int, query: str) -> dict:
+        # catalog_version is only part of the cache key
+        return self._run(query)
+
+    def _run(self, query: str) -> dict:
+        """Run a query through the agent pipeline."""
+        # Nodes fill in the remaining keys; unset keys read as missing
+        initial_state: AgentState = {"query": query}
+
+        if self.use_graph:
+            final_state = self.graph.invoke(initial_state)
+        else:
+            final_state = self._run_nodes(initial_state)
 
         return {
             "response": final_state.get("response", ""),
@@ -180,13 +249,7 @@ class ProductAgent:
         }
 
 
-# Singleton instance
-_agent: ProductAgent | None = None
-
-
+@cache
 def get_agent() -> ProductAgent:
     """Get or create the agent instance."""
-    global _agent
-    if _agent is None:
-        _agent = ProductAgent()
-    return _agent
+    return ProductAgent()
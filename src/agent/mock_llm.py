@@ -2,95 +2,156 @@
 
 import re
 from dataclasses import dataclass
-from typing import Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class ToolCall:
-    """Represents a parsed tool call."""
+    """Represents a parsed tool call.
+
+    ``arguments`` is stored as a read-only copy, since parse results are
+    shared between identical queries by the parse cache.
+    """
     tool_name: str
-    arguments: dict[str, Any]
+    arguments: Mapping[str, Any]
+
+    def __post_init__(self):
+        object.__setattr__(self, "arguments", MappingProxyType(dict(self.arguments)))
 
 
-@dataclass
+@dataclass(frozen=True)
 class ParseResult:
-    """Result of parsing a user query."""
-    tool_calls: list[ToolCall]
+    """Result of parsing a user query.
+
+    Instances are shared between identical queries by the parse cache,
+    so they are frozen and ``tool_calls`` is a tuple.
+    """
+    tool_calls: tuple[ToolCall, ...]
     response_template: str
 
 
+# Intent patterns as (compiled regex, MockLLM handler name), tried in order
+# against the lower-cased query. Compiled once at import.
+_INTENT_PATTERNS: list[tuple[re.Pattern, str]] = [
+    # Add product - MUST be first to catch "добавь" before other patterns.
+    # Same language as "(добав|создай)\w*\s*.*(продукт|товар)", but without
+    # the overlapping \w*/\s*/.* runs that backtrack cubically on long input.
+    (
+        re.compile(r"(добав|создай)(?:\w*\s*\n)?.*?(продукт|товар)"),
+        "_parse_add_product",
+    ),
+    # Statistics patterns
+    (
+        re.compile(r"(статистик|средн\w* цен|сколько товаров|сколько продуктов)"),
+        "_parse_statistics",
+    ),
+    # Calculate discount - flexible pattern
+    (
+        re.compile(r"скидк\w*\s*(\d+)\s*%.*?(?:id|ID|Id)\s*(\d+)"),
+        "_parse_discount",
+    ),
+    # Get product by ID - specific patterns with ID keyword
+    (
+        re.compile(r"(покажи|найди|информаци\w*|дай)\s*(о\s*)?(продукт|товар)\w*\s*(id|ID|Id)\s*[=:]?\s*(\d+)"),
+        "_parse_get_product_with_id",
+    ),
+    # Get product by ID - "товар ID N" pattern
+    (
+        re.compile(r"(продукт|товар)\s+(id|ID|Id)\s*[=:]?\s*(\d+)"),
+        "_parse_get_product_simple",
+    ),
+    # List products with category
+    (
+        re.compile(r"(покажи|список|все)\s*(продукт|товар)\w*\s*(категории|из категории|в категории)\s+[\"']?(\w+)[\"']?"),
+        "_parse_list_with_category",
+    ),
+    # List products by category (alternative)
+    (
+        re.compile(r"(категори\w*)\s+[\"']?(\w+)[\"']?"),
+        "_parse_category",
+    ),
+    # General list products (fallback)
+    (
+        re.compile(r"(покажи|список|все|вывести)\s*(продукт|товар)"),
+        "_parse_list_all",
+    ),
+]
+
+# Every intent pattern contains at least one of these substrings. Queries
+# with none of them cannot match any intent, so the regex is skipped.
+_INTENT_KEYWORDS = (
+    "продукт", "товар", "категори", "статистик", "скидк",
+    "средн", "сколько", "добав", "создай",
+)
+
+
+def _has_intent_keyword(query_lower: str) -> bool:
+    """Check whether the query contains any intent keyword."""
+    for keyword in _INTENT_KEYWORDS:
+        if keyword in query_lower:
+            return True
+    return False
+
+
+_NAME_RE = re.compile(r'(?:продукт|товар)[:\s]+([^,]+)', re.IGNORECASE)
+_PRICE_RE = re.compile(r'цена\s*[=:]*\s*(\d+)', re.IGNORECASE)
+_CATEGORY_RE = re.compile(r'категория\s*[=:]*\s*(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=64)
+def _compile_ignorecase(pattern: str) -> re.Pattern:
+    """Compile a dynamically built pattern once per distinct string."""
+    return re.compile(pattern, re.IGNORECASE)
+
+
 class MockLLM:
     """Mock LLM that parses requests using regex patterns."""
 
-    def __init__(self):
+    def __init__(self, cache_size: int = 1024):
         self.patterns = [
-            # Add product - MUST be first to catch "добавь" before other patterns
-            (
-                r"(добав|создай)\w*\s*.*(продукт|товар)",
-                self._parse_add_product
-            ),
-            # Statistics patterns
-            (
-                r"(статистик|средн\w* цен|сколько товаров|сколько продуктов)",
-                self._parse_statistics
-            ),
-            # Calculate discount - flexible pattern
-            (
-                r"скидк\w*\s*(\d+)\s*%.*?(?:id|ID|Id)\s*(\d+)",
-                self._parse_discount
-            ),
-            # Get product by ID - specific patterns with ID keyword
-            (
-                r"(покажи|найди|информаци\w*|дай)\s*(о\s*)?(продукт|товар)\w*\s*(id|ID|Id)\s*[=:]?\s*(\d+)",
-                self._parse_get_product_with_id
-            ),
-            # Get product by ID - "товар ID N" pattern
-            (
-                r"(продукт|товар)\s+(id|ID|Id)\s*[=:]?\s*(\d+)",
-                self._parse_get_product_simple
-            ),
-            # List products with category
-            (
-                r"(покажи|список|все)\s*(продукт|товар)\w*\s*(категории|из категории|в категории)\s+[\"']?(\w+)[\"']?",
-                self._parse_list_with_category
-            ),
-            # List products by category (alternative)
-            (
-                r"(категори\w*)\s+[\"']?(\w+)[\"']?",
-                self._parse_category
-            ),
-            # General list products (fallback)
-            (
-                r"(покажи|список|все|вывести)\s*(продукт|товар)",
-                self._parse_list_all
-            ),
+            (regex, getattr(self, handler_name))
+            for regex, handler_name in _INTENT_PATTERNS
         ]
+        self._parse_cached = lru_cache(maxsize=cache_size)(self._parse_uncached)
 
     def parse(self, query: str) -> ParseResult:
         """Parse user query and determine which tools to call.
 
+        Results are memoized per query string, so repeated queries skip
+        the regex pipeline entirely.
+
         Args:
             query: User query string
 
         Returns:
             ParseResult with tool calls and response template
         """
+        return self._parse_cached(query)
+
+    def clear_cache(self) -> None:
+        """Drop all memoized parse results."""
+        self._parse_cached.cache_clear()
+
+    def _parse_uncached(self, query: str) -> ParseResult:
         query_lower = query.lower()
 
-        for pattern, parser_func in self.patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                return parser_func(match, query)
+        if _has_intent_keyword(query_lower):
+            for regex, parser_func in self.patterns:
+                match = regex.search(query_lower)
+                if match:
+                    return parser_func(match, query)
 
         # Default: list all products
         return ParseResult(
-            tool_calls=[ToolCall("list_products", {})],
+            tool_calls=(ToolCall("list_products", {}),),
             response_template="Вот список продуктов:\n{result}"
         )
 
     def _parse_statistics(self, match: re.Match, query: str) -> ParseResult:
         return ParseResult(
-            tool_calls=[ToolCall("get_statistics", {})],
+            tool_calls=(ToolCall("get_statistics", {}),),
             response_template="Статистика по продуктам:\n{result}"
         )
 
@@ -100,33 +161,33 @@ class MockLLM:
 
         if category:
             return ParseResult(
-                tool_calls=[ToolCall("list_products", {"category": category})],
+                tool_calls=(ToolCall("list_products", {"category": category}),),
                 response_template=f"Продукты в категории '{category}':\n{{result}}"
             )
 
         return ParseResult(
-            tool_calls=[ToolCall("list_products", {})],
+            tool_calls=(ToolCall("list_products", {}),),
             response_template="Список всех продуктов:\n{result}"
         )
 
     def _parse_category(self, match: re.Match, query: str) -> ParseResult:
         category = match.group(2)
         return ParseResult(
-            tool_calls=[ToolCall("list_products", {"category": category})],
+            tool_calls=(ToolCall("list_products", {"category": category}),),
             response_template=f"Продукты в категории '{category}':\n{{result}}"
         )
 
     def _parse_get_product_with_id(self, match: re.Match, query: str) -> ParseResult:
         product_id = int(match.group(5))
         return ParseResult(
-            tool_calls=[ToolCall("get_product", {"product_id": product_id})],
+            tool_calls=(ToolCall("get_product", {"product_id": product_id}),),
             response_template="Информация о продукте:\n{result}"
         )
 
     def _parse_get_product_simple(self, match: re.Match, query: str) -> ParseResult:
         product_id = int(match.group(3))
         return ParseResult(
-            tool_calls=[ToolCall("get_product", {"product_id": product_id})],
+            tool_calls=(ToolCall("get_product", {"product_id": product_id}),),
             response_template="Информация о продукте:\n{result}"
         )
 
@@ -139,29 +200,29 @@ class MockLLM:
         category = "Без категории"
 
         # Try to extract name after "продукт:" or "товар:"
-        name_match = re.search(r'(?:продукт|товар)[:\s]+([^,]+)', query, re.IGNORECASE)
+        name_match = _NAME_RE.search(query)
         if name_match:
             name = name_match.group(1).strip()
 
         # Extract price
-        price_match = re.search(r'цена\s*[=:]*\s*(\d+)', query, re.IGNORECASE)
+        price_match = _PRICE_RE.search(query)
         if price_match:
             price = float(price_match.group(1))
 
         # Extract category
-        cat_match = re.search(r'категория\s*[=:]*\s*(\w+)', query, re.IGNORECASE)
+        cat_match = _CATEGORY_RE.search(query)
         if cat_match:
             category = cat_match.group(1)
 
         in_stock = "нет в наличии" not in query.lower()
 
         return ParseResult(
-            tool_calls=[ToolCall("add_product", {
+            tool_calls=(ToolCall("add_product", {
                 "name": name,
                 "price": price,
                 "category": category,
                 "in_stock": in_stock
-            })],
+            }),),
             response_template="Продукт добавлен:\n{result}"
         )
 
@@ -170,23 +231,23 @@ class MockLLM:
         product_id = int(match.group(2))
 
         return ParseResult(
-            tool_calls=[
+            tool_calls=(
                 ToolCall("get_product", {"product_id": product_id}),
-                ToolCall("calculate_discount", {"percent": percent})
-            ],
+                ToolCall("calculate_discount", {"percent": percent}),
+            ),
             response_template="Расчёт скидки:\n{result}"
         )
 
     def _parse_list_all(self, match: re.Match, query: str) -> ParseResult:
         return ParseResult(
-            tool_calls=[ToolCall("list_products", {})],
+            tool_calls=(ToolCall("list_products", {}),),
             response_template="Список всех продуктов:\n{result}"
         )
 
     def _extract_quoted(self, text: str, prefix_pattern: str) -> Optional[str]:
         """Extract quoted value after a prefix pattern."""
         pattern = rf'{prefix_pattern}\s*[=:]*\s*["\']([^"\']+)["\']'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _compile_ignorecase(pattern).search(text)
         if match:
             return match.group(1)
         return None
@@ -194,7 +255,7 @@ class MockLLM:
     def _extract_number(self, text: str, prefix_pattern: str) -> Optional[float]:
         """Extract number value after a prefix pattern."""
         pattern = rf'{prefix_pattern}\s*[=:]*\s*(\d+(?:\.\d+)?)'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _compile_ignorecase(pattern).search(text)
         if match:
             return float(match.group(1))
         return None
@@ -35,25 +35,17 @@ def format_price(amount: Union[int, float]) -> str:
 def format_product_list(products: list[dict]) -> list[dict]:
     """Format a list of products for display.
 
+    Products from the MCP server already carry exactly the display fields
+    (id, name, price, category, in_stock), so they are passed through
+    without rebuilding each dict.
+
     Args:
         products: List of product dictionaries
 
     Returns:
-        List of formatted product dictionaries
+        New list holding the same product dictionaries
     """
-    if not products:
-        return []
-
-    return [
-        {
-            "id": p["id"],
-            "name": p["name"],
-            "price": p["price"],
-            "category": p["category"],
-            "in_stock": p.get("in_stock", False)
-        }
-        for p in products
-    ]
+    return list(products)
 
 
 def format_statistics(stats: dict) -> dict:
@@ -1,12 +1,21 @@
 """FastAPI application for the product agent."""
 
+import asyncio
+import json
 from contextlib import asynccontextmanager
+from functools import lru_cache
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from .schemas import ErrorResponse, HealthResponse, QueryRequest, QueryResponse
 from ..agent.graph import get_agent
+from ..mcp_server.server import get_catalog_version
+
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib encoder
+    orjson = None
 
 
 @asynccontextmanager
@@ -35,6 +44,44 @@ app.add_middleware(
 )
 
 
+def _encode_query(query: str) -> bytes:
+    """Run a query and encode the QueryResponse body as JSON."""
+    # The encoded bytes are cached below, so skip the agent's result cache
+    result = get_agent().process_query(query, use_cache=False)
+    payload = {"response": result["response"], "tools_used": result["tools_used"]}
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+@lru_cache(maxsize=1024)
+def _encode_query_cached(catalog_version: int, query: str) -> bytes:
+    # catalog_version is only part of the cache key
+    return _encode_query(query)
+
+
+# Catalog version the entries in _encode_query_cached were encoded for
+_cached_version: int | None = None
+
+
+def _render_query(query: str) -> bytes:
+    """Encode a query's response, reusing it for read-only queries.
+
+    Read-only queries reuse the encoded body until the catalog changes.
+    Runs in a worker thread, since even the read-only check parses the
+    query.
+    """
+    global _cached_version
+    if get_agent().is_read_only(query):
+        version = get_catalog_version()
+        if version != _cached_version:
+            # Bodies encoded for an older catalog can never be served again
+            _encode_query_cached.cache_clear()
+            _cached_version = version
+        return _encode_query_cached(version, query)
+    return _encode_query(query)
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Check API health status."""
@@ -60,12 +107,10 @@ async def process_query(request: QueryRequest):
     - "Скидка 10% на товар ID 1"
     """
     try:
-        agent = get_agent()
-        result = agent.process_query(request.query)
-        return QueryResponse(
-            response=result["response"],
-            tools_used=result["tools_used"]
-        )
+        # Parsing and tool calls are blocking; keep them off the event loop.
+        # The body is returned as-is, skipping FastAPI's response encoding.
+        body = await asyncio.to_thread(_render_query, request.query)
+        return Response(content=body, media_type="application/json")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
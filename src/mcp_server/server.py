@@ -1,49 +1,245 @@
 """FastMCP server for product management."""
 
+import atexit
 import json
+import mmap
+import os
+import pickle
+import sys
+import threading
+from collections import Counter
+from operator import itemgetter
 from pathlib import Path
 from typing import Optional
 
 from mcp.server.fastmcp import FastMCP
 
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib encoder
+    orjson = None
+
 # Initialize FastMCP server
 mcp = FastMCP("products-server")
 
-# Load initial data
+# Load initial data. DATA_FILE holds a snapshot of the catalog; products
+# added since the last snapshot are appended to JOURNAL_FILE, one JSON
+# object per line, so an insert writes one line instead of the whole file.
 DATA_FILE = Path(__file__).parent / "products.json"
+JOURNAL_FILE = DATA_FILE.with_suffix(".jsonl")
+
+# Journal entries written by this process before it is folded into DATA_FILE
+JOURNAL_COMPACT_THRESHOLD = 1000
+
+# Seconds to collect new products before writing them to the journal in one
+# append, so a burst of inserts costs a single write
+JOURNAL_FLUSH_DELAY = 0.1
+
+# Snapshots larger than this are memory-mapped and parsed in place
+MMAP_THRESHOLD = 4096
+
+
+def _json_loads(data: bytes):
+    """Parse UTF-8 encoded JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 encoded JSON, optionally indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode()
+
+
+def _load_snapshot() -> list[dict]:
+    """Load products from the JSON snapshot."""
+    if not DATA_FILE.exists():
+        return []
+    with open(DATA_FILE, "rb") as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as view:
+                return orjson.loads(view)
+        return _json_loads(f.read())
+
+
+def _load_journal() -> list[dict]:
+    """Load products from the journal, dropping a line torn by a crash."""
+    if not JOURNAL_FILE.exists():
+        return []
+    with open(JOURNAL_FILE, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        # Cut the partial line off so the next append starts a fresh line
+        with open(JOURNAL_FILE, "r+b") as f:
+            f.truncate(end)
+    return [_json_loads(line) for line in data[:end].split(b"\n") if line]
+
+
+def _unique_by_id(products: list[dict]) -> list[dict]:
+    """Drop products whose id appears again later, keeping the later entry.
+
+    A crash after a snapshot is swapped in but before the journal is removed
+    leaves journaled products in both files.
+    """
+    return list({product["id"]: product for product in products}.values())
 
 
 def load_products() -> list[dict]:
-    """Load products from JSON file."""
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    """Load products from the JSON snapshot plus the append-only journal."""
+    return _unique_by_id(_load_snapshot() + _load_journal())
 
 
 def save_products(products: list[dict]) -> None:
-    """Save products to JSON file."""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
-
+    """Save products to the JSON snapshot and clear the journal.
 
-# In-memory storage
-_products: list[dict] = load_products()
+    The snapshot is written to a temporary file and swapped in with
+    os.replace, so a crash mid-write never leaves a truncated snapshot.
+    """
+    tmp_file = DATA_FILE.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(_json_dumps(products, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, DATA_FILE)
+    JOURNAL_FILE.unlink(missing_ok=True)
+
+
+def _append_to_journal(lines: list[bytes]) -> None:
+    """Persist new products by appending their encoded lines to the journal."""
+    with open(JOURNAL_FILE, "ab") as f:
+        f.write(b"".join(lines))
+
+
+# In-memory storage; _products is canonical, the rest is derived from it:
+# _by_id and _by_category (keyed by case-folded category) index products,
+# the running aggregates back get_statistics, and _max_id feeds new ids.
+_products: list[dict] = []
+_by_id: dict[int, dict] = {}
+_by_category: dict[str, list[dict]] = {}
+_price_sum: float = 0
+_in_stock_count: int = 0
+_category_counts: Counter[str] = Counter()
+_max_id: int = 0
+
+# Bumped on every catalog change, so callers can key caches on it
+_catalog_version: int = 0
+
+
+def _set_products(products: list[dict]) -> None:
+    """Replace the in-memory storage and rebuild everything derived from it."""
+    global _products, _by_id, _by_category
+    global _price_sum, _in_stock_count, _category_counts, _max_id
+    global _catalog_version
+    _catalog_version += 1
+    _products = products
+    _by_id = {}
+    _by_category = {}
+    _price_sum = 0
+    _in_stock_count = 0
+    _category_counts = Counter()
+    _max_id = 0
+    for product in products:
+        _index_product(product)
+
+
+def _index_product(product: dict) -> None:
+    """Account for a newly stored product in the indexes and aggregates."""
+    global _price_sum, _in_stock_count, _max_id
+    # Few distinct categories are shared by many products; intern them so
+    # each is stored once and equal keys compare by identity
+    category = product["category"] = sys.intern(product["category"])
+    _by_id[product["id"]] = product
+    _max_id = max(_max_id, product["id"])
+    _by_category.setdefault(sys.intern(category.casefold()), []).append(product)
+    _price_sum += product["price"]
+    if product["in_stock"]:
+        _in_stock_count += 1
+    _category_counts[category] += 1
+
+
+# Catalog as loaded at import, pickled so resets skip file I/O and parsing
+_initial_journal = _load_journal()
+_INITIAL_SNAPSHOT = pickle.dumps(_unique_by_id(_load_snapshot() + _initial_journal))
+_set_products(pickle.loads(_INITIAL_SNAPSHOT))
+
+# Fields of a stored product, in storage order
+PRODUCT_FIELDS = ("id", "name", "price", "category", "in_stock")
+
+# itemgetters for list_products field projections, keyed by field tuple
+_projectors: dict[tuple[str, ...], itemgetter] = {}
+
+# Serializes writers; tools may be called from several worker threads
+_write_lock = threading.Lock()
+_journal_length = len(_initial_journal)
+del _initial_journal
+
+# Encoded journal lines not yet written, and the timer that will write them
+_pending_journal: list[bytes] = []
+_flush_timer: threading.Timer | None = None
+
+
+def _flush_journal_locked() -> None:
+    """Write pending journal lines; the caller must hold _write_lock."""
+    global _flush_timer
+    if _flush_timer is not None:
+        _flush_timer.cancel()
+        _flush_timer = None
+    if _pending_journal:
+        _append_to_journal(_pending_journal)
+        _pending_journal.clear()
+
+
+def flush_products() -> None:
+    """Write products added since the last flush to the journal."""
+    with _write_lock:
+        _flush_journal_locked()
+
+
+atexit.register(flush_products)
 
 
 @mcp.tool()
-def list_products(category: Optional[str] = None) -> list[dict]:
+def list_products(
+    category: Optional[str] = None,
+    fields: Optional[list[str]] = None,
+) -> list[dict]:
     """List all products, optionally filtered by category.
 
     Args:
         category: Optional category name to filter products
+        fields: Optional product fields to include, e.g. ["id", "name"];
+            all fields are returned by default
 
     Returns:
         List of products matching the criteria
     """
     if category:
-        return [p for p in _products if p["category"].lower() == category.lower()]
-    return _products
+        # A copy, so callers changing the result can't corrupt the index
+        products = list(_by_category.get(category.casefold(), ()))
+    else:
+        products = _products
+
+    if not fields:
+        return products
+
+    # Drop repeats, so the projector cache is bounded by the orderings of
+    # PRODUCT_FIELDS rather than by what clients send
+    fields = tuple(dict.fromkeys(fields))
+    unknown = set(fields).difference(PRODUCT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(sorted(unknown))}")
+    if len(fields) == 1:
+        field = fields[0]
+        return [{field: p[field]} for p in products]
+
+    project = _projectors.get(fields)
+    if project is None:
+        project = _projectors[fields] = itemgetter(*fields)
+    return [dict(zip(fields, project(p))) for p in products]
 
 
 @mcp.tool()
@@ -56,9 +252,9 @@ def get_product(product_id: int) -> dict:
     Returns:
         Product data or error message
     """
-    for product in _products:
-        if product["id"] == product_id:
-            return product
+    product = _by_id.get(product_id)
+    if product is not None:
+        return product
     return {"error": f"Product with ID {product_id} not found"}
 
 
@@ -75,19 +271,41 @@ def add_product(name: str, price: float, category: str, in_stock: bool = True) -
     Returns:
         The newly created product
     """
-    # Generate new ID
-    new_id = max((p["id"] for p in _products), default=0) + 1
-
-    new_product = {
-        "id": new_id,
-        "name": name,
-        "price": price,
-        "category": category,
-        "in_stock": in_stock
-    }
+    global _journal_length, _catalog_version, _flush_timer
+
+    with _write_lock:
+        # Generate new ID
+        new_id = _max_id + 1
+
+        new_product = {
+            "id": new_id,
+            "name": name,
+            "price": price,
+            "category": category,
+            "in_stock": in_stock
+        }
 
-    _products.append(new_product)
-    save_products(_products)
+        _products.append(new_product)
+        _index_product(new_product)
+        _catalog_version += 1
+
+        _pending_journal.append(_json_dumps(new_product) + b"\n")
+        _journal_length += 1
+        if _journal_length >= JOURNAL_COMPACT_THRESHOLD:
+            try:
+                save_products(_products)
+            except OSError:
+                # Keep the pending lines for the journal; compaction is
+                # retried on the next insert
+                pass
+            else:
+                # The snapshot includes every pending product
+                _pending_journal.clear()
+                _journal_length = 0
+        if _pending_journal and _flush_timer is None:
+            _flush_timer = threading.Timer(JOURNAL_FLUSH_DELAY, flush_products)
+            _flush_timer.daemon = True
+            _flush_timer.start()
 
     return new_product
 
@@ -108,27 +326,38 @@ def get_statistics() -> dict:
         }
 
     total_count = len(_products)
-    average_price = sum(p["price"] for p in _products) / total_count
-    in_stock_count = sum(1 for p in _products if p["in_stock"])
-
-    # Category breakdown
-    categories: dict[str, int] = {}
-    for product in _products:
-        cat = product["category"]
-        categories[cat] = categories.get(cat, 0) + 1
+    average_price = _price_sum / total_count
 
     return {
         "total_count": total_count,
         "average_price": round(average_price, 2),
-        "in_stock_count": in_stock_count,
-        "categories": categories
+        "in_stock_count": _in_stock_count,
+        "categories": dict(_category_counts)
     }
 
 
 def reset_products() -> None:
-    """Reset products to initial data (for testing)."""
-    global _products
-    _products = load_products()
+    """Reset products to the data loaded at import (for testing).
+
+    Products added since the last flush are discarded, not journaled, and
+    the journal is deleted along with them, so ids handed out after the
+    reset can't collide with journaled ones. The snapshot is not touched;
+    tests point DATA_FILE and JOURNAL_FILE at scratch files first.
+    """
+    global _flush_timer, _journal_length
+    with _write_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        _pending_journal.clear()
+        JOURNAL_FILE.unlink(missing_ok=True)
+        _journal_length = 0
+        _set_products(pickle.loads(_INITIAL_SNAPSHOT))
+
+
+def get_catalog_version() -> int:
+    """Get a counter that changes whenever the catalog changes."""
+    return _catalog_version
 
 
 def get_products_storage() -> list[dict]:
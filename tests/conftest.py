@@ -0,0 +1,20 @@
+"""Shared test fixtures."""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.mcp_server import server
+
+
+@pytest.fixture(autouse=True)
+def data_files(tmp_path, monkeypatch):
+    """Point persistence at temporary files so tests never touch the real data."""
+    data_file = tmp_path / "products.json"
+    journal_file = tmp_path / "products.jsonl"
+    monkeypatch.setattr(server, "DATA_FILE", data_file)
+    monkeypatch.setattr(server, "JOURNAL_FILE", journal_file)
+    return data_file, journal_file
@@ -10,7 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.agent.graph import ProductAgent, get_agent
 from src.agent.mock_llm import MockLLM
 from src.agent.tools import calculate_discount, format_product_list
-from src.mcp_server.server import reset_products
+from src.mcp_server.server import add_product, get_products_storage, reset_products
 
 
 @pytest.fixture(autouse=True)
@@ -58,6 +58,36 @@ class TestMockLLM:
         assert "get_product" in tool_names
         assert "calculate_discount" in tool_names
 
+    def test_parse_unrecognized_query(self):
+        """Test query without intent keywords falls back to listing."""
+        llm = MockLLM()
+        result = llm.parse("Привет, как дела?")
+
+        assert len(result.tool_calls) == 1
+        assert result.tool_calls[0].tool_name == "list_products"
+        assert result.tool_calls[0].arguments == {}
+
+    def test_parse_is_cached(self):
+        """Test repeated queries reuse the cached parse result."""
+        llm = MockLLM()
+        first = llm.parse("Покажи товар ID 1")
+        second = llm.parse("Покажи товар ID 1")
+        assert first is second
+
+        llm.clear_cache()
+        third = llm.parse("Покажи товар ID 1")
+        assert third is not first
+        assert third == first
+
+    def test_parse_result_arguments_read_only(self):
+        """Test cached parse results can't be changed through their arguments."""
+        llm = MockLLM()
+        result = llm.parse("Покажи товар ID 1")
+
+        with pytest.raises(TypeError):
+            result.tool_calls[0].arguments["product_id"] = 2
+        assert llm.parse("Покажи товар ID 1").tool_calls[0].arguments == {"product_id": 1}
+
 
 class TestCustomTools:
     """Tests for custom agent tools."""
@@ -129,3 +159,75 @@ class TestProductAgent:
 
         assert "response" in result
         assert "list_products" in result["tools_used"]
+
+    def test_process_query_graph_matches_direct(self):
+        """Test LangGraph and direct node execution give the same result."""
+        direct = ProductAgent(use_graph=False)
+        graph = ProductAgent(use_graph=True)
+
+        for query in ("Покажи все продукты", "Скидка 15% на товар ID 1", "Покажи товар ID 9999"):
+            assert direct.process_query(query) == graph.process_query(query)
+
+    def test_read_only_query_cached_until_catalog_changes(self):
+        """Test cached results are reused until the catalog changes."""
+        agent = ProductAgent()
+        first = agent.process_query("Покажи все продукты")
+        assert agent.process_query("Покажи все продукты") == first
+
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+        updated = agent.process_query("Покажи все продукты")
+
+        assert updated != first
+        assert new_product in updated["response"]["products"]
+
+    def test_cached_result_not_shared(self):
+        """Test changing a returned result does not affect later calls."""
+        agent = ProductAgent()
+        first = agent.process_query("Покажи все продукты")
+        expected_count = len(first["response"]["products"])
+
+        first["tools_used"].append("other_tool")
+        first["response"]["products"].clear()
+        first["response"]["extra"] = True
+
+        second = agent.process_query("Покажи все продукты")
+        assert second["tools_used"] == ["list_products"]
+        assert len(second["response"]["products"]) == expected_count
+        assert "extra" not in second["response"]
+
+    def test_cached_nested_result_not_shared(self):
+        """Test changing nested dicts of a result does not affect later calls."""
+        agent = ProductAgent()
+        stats = agent.process_query("Статистика по товарам")
+        stats["response"]["statistics"]["total_count"] = -1
+        stats["response"]["statistics"]["categories"].clear()
+        assert agent.process_query("Статистика по товарам") == agent.process_query(
+            "Статистика по товарам", use_cache=False
+        )
+
+        discount = agent.process_query("Скидка 15% на товар ID 1")
+        discount["response"]["discount"]["final_price"] = 0
+        assert agent.process_query("Скидка 15% на товар ID 1") == agent.process_query(
+            "Скидка 15% на товар ID 1", use_cache=False
+        )
+
+    def test_cache_drops_stale_entries(self):
+        """Test cached results for an older catalog are dropped after an add."""
+        agent = ProductAgent()
+        agent.process_query("Покажи все продукты")
+        agent.process_query("Статистика по товарам")
+        assert agent._run_cached.cache_info().currsize == 2
+
+        add_product(name="Лампа", price=700, category="Свет")
+        agent.process_query("Покажи все продукты")
+        assert agent._run_cached.cache_info().currsize == 1
+
+    def test_add_query_not_cached(self):
+        """Test repeated add queries each add a product."""
+        agent = ProductAgent()
+        initial_count = len(get_products_storage())
+
+        agent.process_query("Добавь продукт: Лампа, цена 700, категория Свет")
+        agent.process_query("Добавь продукт: Лампа, цена 700, категория Свет")
+
+        assert len(get_products_storage()) == initial_count + 2
@@ -9,7 +9,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from fastapi.testclient import TestClient
 
-from src.api.main import app
+from src.api.main import _encode_query_cached, app
 from src.mcp_server.server import reset_products
 
 
@@ -107,3 +107,34 @@ class TestAgentQueryEndpoint:
         # Should contain electronics products
         products = data["response"]["products"]
         assert len(products) >= 2
+
+    def test_query_list_reflects_added_product(self, client):
+        """Test repeated listing picks up a product added in between."""
+        query = {"query": "Покажи все продукты"}
+        first = client.post("/api/v1/agent/query", json=query)
+        assert client.post("/api/v1/agent/query", json=query).content == first.content
+
+        added = client.post(
+            "/api/v1/agent/query",
+            json={"query": "Добавь продукт: Лампа, цена 700, категория Свет"}
+        )
+        assert added.status_code == 200
+        new_product = added.json()["response"]["added_product"]
+
+        products = client.post("/api/v1/agent/query", json=query).json()["response"]["products"]
+        assert new_product in products
+        assert len(products) == len(first.json()["response"]["products"]) + 1
+
+    def test_query_cache_drops_stale_entries(self, client):
+        """Test cached bodies for an older catalog are dropped after an add."""
+        query = {"query": "Покажи все продукты"}
+        client.post("/api/v1/agent/query", json=query)
+        client.post("/api/v1/agent/query", json={"query": "Статистика по товарам"})
+        assert _encode_query_cached.cache_info().currsize == 2
+
+        client.post(
+            "/api/v1/agent/query",
+            json={"query": "Добавь продукт: Лампа, цена 700, категория Свет"}
+        )
+        client.post("/api/v1/agent/query", json=query)
+        assert _encode_query_cached.cache_info().currsize == 1
@@ -7,13 +7,17 @@ from pathlib import Path
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.mcp_server import server
 from src.mcp_server.server import (
     list_products,
     get_product,
     add_product,
     get_statistics,
     reset_products,
+    flush_products,
     get_products_storage,
+    load_products,
+    save_products,
 )
 
 
@@ -47,6 +51,43 @@ class TestListProducts:
         products = list_products(category="НесуществующаяКатегория")
         assert products == []
 
+    def test_list_products_with_fields(self):
+        """Test listing only selected product fields."""
+        products = list_products(category="Электроника", fields=["id", "name"])
+
+        assert products
+        for product in products:
+            assert set(product) == {"id", "name"}
+        assert list_products(fields=["name"]) == [
+            {"name": p["name"]} for p in list_products()
+        ]
+
+    def test_list_products_repeated_fields(self):
+        """Test repeated fields are projected once and cached once."""
+        expected = list_products(fields=["id", "name"])
+
+        assert list_products(fields=["id", "name", "id"]) == expected
+        assert list_products(fields=["id"] * 3 + ["name"]) == expected
+        assert ("id", "name", "id") not in server._projectors
+
+    def test_list_products_unknown_field(self):
+        """Test requesting an unknown field raises an error."""
+        with pytest.raises(ValueError):
+            list_products(fields=["id", "color"])
+
+    def test_list_products_by_category_includes_added(self):
+        """Test category filter is case-insensitive and sees new products."""
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+
+        assert new_product in list_products(category="СВЕТ")
+
+    def test_list_products_by_category_returns_copy(self):
+        """Test changing a filtered result does not affect later listings."""
+        expected = list_products(category="Электроника")
+        list_products(category="Электроника").clear()
+
+        assert list_products(category="Электроника") == expected
+
 
 class TestGetProduct:
     """Tests for get_product tool."""
@@ -64,6 +105,12 @@ class TestGetProduct:
         result = get_product(product_id=9999)
         assert "error" in result
 
+    def test_get_added_product(self):
+        """Test a newly added product can be fetched by its ID."""
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+
+        assert get_product(product_id=new_product["id"]) == new_product
+
 
 class TestAddProduct:
     """Tests for add_product tool."""
@@ -89,6 +136,131 @@ class TestAddProduct:
         # Verify product was added
         assert len(get_products_storage()) == initial_count + 1
 
+    def test_add_product_ids_increase(self):
+        """Test new products get the next unused ID."""
+        max_id = max(p["id"] for p in get_products_storage())
+
+        first = add_product(name="Лампа", price=700, category="Свет")
+        second = add_product(name="Торшер", price=900, category="Свет")
+
+        assert first["id"] == max_id + 1
+        assert second["id"] == max_id + 2
+
+
+class TestPersistence:
+    """Tests for snapshot + journal persistence."""
+
+    def test_added_product_is_journaled(self, data_files):
+        """Test add_product appends to the journal and reloads from it."""
+        data_file, journal_file = data_files
+        save_products(get_products_storage())
+        snapshot = data_file.read_bytes()
+
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+
+        assert data_file.read_bytes() == snapshot
+        assert load_products() == get_products_storage()
+        assert load_products()[-1] == new_product
+
+    def test_load_large_snapshot(self, data_files):
+        """Test a snapshot above the mmap threshold loads intact."""
+        products = [
+            {"id": i, "name": f"Товар {i}", "price": i * 10, "category": "Тест", "in_stock": True}
+            for i in range(1, 201)
+        ]
+        save_products(products)
+
+        assert server.DATA_FILE.stat().st_size > server.MMAP_THRESHOLD
+        assert load_products() == products
+
+    def test_journal_writes_are_coalesced(self, data_files):
+        """Test a burst of inserts is written to the journal in one flush."""
+        _, journal_file = data_files
+        add_product(name="Лампа", price=700, category="Свет")
+        add_product(name="Торшер", price=900, category="Свет")
+
+        assert not journal_file.exists()
+        flush_products()
+        assert len(journal_file.read_bytes().splitlines()) == 2
+
+    def test_torn_journal_line_is_ignored(self, data_files):
+        """Test a partially written trailing journal line is skipped."""
+        _, journal_file = data_files
+        journal_file.write_text(
+            '{"id": 1, "name": "A", "price": 1, "category": "B", "in_stock": true}\n'
+            '{"id": 2, "na',
+            encoding="utf-8",
+        )
+
+        assert [p["id"] for p in load_products()] == [1]
+
+    def test_append_after_torn_journal_line(self, data_files):
+        """Test products added after a crash mid-write survive a reload."""
+        _, journal_file = data_files
+        journal_file.write_text(
+            '{"id": 1, "name": "A", "price": 1, "category": "B", "in_stock": true}\n'
+            '{"id": 2, "na',
+            encoding="utf-8",
+        )
+        load_products()
+
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+
+        products = load_products()
+        assert [p["id"] for p in products] == [1, new_product["id"]]
+        assert products[-1] == new_product
+
+    def test_journal_left_after_snapshot_not_duplicated(self, data_files):
+        """Test products in both the snapshot and the journal load once."""
+        _, journal_file = data_files
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+        journal = journal_file.read_bytes()
+        # Crash between swapping in the snapshot and removing the journal
+        save_products(get_products_storage())
+        journal_file.write_bytes(journal)
+
+        products = load_products()
+        assert products == get_products_storage()
+        assert [p["id"] for p in products].count(new_product["id"]) == 1
+
+    def test_failed_compaction_keeps_pending_products(self, data_files, monkeypatch):
+        """Test products are still journaled when the snapshot write fails."""
+        def fail_save(products):
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(server, "JOURNAL_COMPACT_THRESHOLD", 1)
+        monkeypatch.setattr(server, "save_products", fail_save)
+        new_product = add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+
+        assert load_products() == [new_product]
+
+    def test_reset_clears_journal(self, data_files):
+        """Test products added after a reset don't collide with journaled ones."""
+        _, journal_file = data_files
+        add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+        reset_products()
+
+        assert not journal_file.exists()
+        new_product = add_product(name="Торшер", price=900, category="Свет")
+        flush_products()
+        assert load_products() == [new_product]
+
+    def test_save_products_clears_journal(self, data_files):
+        """Test saving a snapshot folds the journal into it."""
+        _, journal_file = data_files
+        add_product(name="Лампа", price=700, category="Свет")
+        flush_products()
+        save_products(get_products_storage())
+
+        assert not journal_file.exists()
+        assert list(journal_file.parent.iterdir()) == [server.DATA_FILE]
+        assert load_products() == get_products_storage()
+
 
 class TestGetStatistics:
     """Tests for get_statistics tool."""
@@ -106,3 +278,16 @@ class TestGetStatistics:
         assert stats["total_count"] >= 3
         assert stats["average_price"] > 0
         assert isinstance(stats["categories"], dict)
+
+    def test_statistics_track_added_product(self):
+        """Test statistics reflect a newly added product."""
+        before = get_statistics()
+        add_product(name="Лампа", price=700, category="Свет", in_stock=False)
+        after = get_statistics()
+
+        assert after["total_count"] == before["total_count"] + 1
+        assert after["in_stock_count"] == before["in_stock_count"]
+        assert after["categories"]["Свет"] == before["categories"].get("Свет", 0) + 1
+        products = get_products_storage()
+        expected_average = sum(p["price"] for p in products) / len(products)
+        assert after["average_price"] == round(expected_average, 2)